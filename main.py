@@ -1,11 +1,17 @@
 import os
+import math
 import time
+import errno
+import socket
+import ssl
 import uuid
 import random
 import asyncio
+import itertools
 import tempfile
 import threading
-from typing import Optional
+from collections import deque
+from typing import Callable, Optional
 
 import requests
 from tqdm import tqdm
@@ -14,6 +20,7 @@ from fake_useragent import UserAgent
 # HTTP 异步请求引擎
 import aiohttp
 from aiohttp import ClientSession, TCPConnector, ClientTimeout, CookieJar
+from multidict import CIMultiDict, CIMultiDictProxy
 
 # Selenium 备用（仅在选择浏览器模式时使用）
 from selenium import webdriver
@@ -26,6 +33,9 @@ try:
 except Exception:
     uc = None
 
+# undetected-chromedriver 默认每次启动都会重写/修补同一个 chromedriver 文件，修补步骤需串行
+_UC_PATCH_LOCK = threading.Lock()
+
 # 仅用于URL处理
 from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
 
@@ -36,23 +46,477 @@ except Exception:
     async_playwright = None
 
 
+class LatencyHistogram:
+    """对数分桶直方图（相邻桶相差5%），内存占用与样本数量无关"""
+
+    LOG_GROWTH = math.log(1.05)
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value_ms: float):
+        idx = 0 if value_ms < 1 else int(math.log(value_ms) / self.LOG_GROWTH) + 1
+        self.buckets[idx] = self.buckets.get(idx, 0) + 1
+        self.count += 1
+        self.total += value_ms
+        self.max = max(self.max, value_ms)
+
+    def percentile(self, p: float) -> float:
+        if self.count == 0:
+            return 0.0
+        rank = max(1, math.ceil(self.count * p / 100.0))
+        seen = 0
+        for idx in sorted(self.buckets):
+            seen += self.buckets[idx]
+            if seen >= rank:
+                # 取桶的几何中点作为代表值
+                value = 0.5 if idx == 0 else math.exp((idx - 0.5) * self.LOG_GROWTH)
+                return min(value, self.max)
+        return self.max
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
 class VisitCounter:
     def __init__(self):
         self.success_count = 0
         self.fail_count = 0
+        self.errors = {}
+        self.timings = {}
         self.lock = threading.Lock()
 
     def increment_success(self):
         with self.lock:
             self.success_count += 1
 
-    def increment_fail(self):
+    def increment_fail(self, kind: str = "other", n: int = 1):
         with self.lock:
-            self.fail_count += 1
+            self.fail_count += n
+            self.errors[kind] = self.errors.get(kind, 0) + n
+
+    def record(self, outcome: str):
+        if outcome == OUTCOME_OK:
+            self.increment_success()
+        else:
+            self.increment_fail(outcome)
 
     def get_counts(self):
         return self.success_count, self.fail_count
 
+    def get_errors(self) -> dict:
+        with self.lock:
+            return dict(self.errors)
+
+    def record_timing(self, name: str, value_ms: float):
+        with self.lock:
+            hist = self.timings.get(name)
+            if hist is None:
+                hist = self.timings[name] = LatencyHistogram()
+            hist.add(value_ms)
+
+    def get_timings(self) -> dict:
+        with self.lock:
+            return dict(self.timings)
+
+
+class JobPool:
+    """共享任务池：工作者按需领取任务，先就绪的工作者先开始并承担更多访问"""
+
+    def __init__(self, total: int, rate: Optional[float] = None):
+        self.total = total
+        self.remaining = total
+        # 可选的派发速率（次/秒），None 表示不限速
+        self.rate = rate
+        self.next_at = 0.0
+        # closed=False 时任务池暂时为空也不结束，等待其他引擎转交任务，直到 close()
+        self.closed = True
+        self.lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self.lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+    def add(self, n: int):
+        with self.lock:
+            self.total += n
+            self.remaining += n
+
+    def drain(self) -> int:
+        """取走所有未领取的任务并返回数量"""
+        with self.lock:
+            n = self.remaining
+            self.remaining = 0
+            return n
+
+    def hold_open(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    async def acquire(self) -> bool:
+        """领取任务并按速率排队等待派发时刻（仅用于异步引擎）"""
+        while not self.take():
+            if self.closed:
+                return False
+            await asyncio.sleep(0.05)
+        await self.pace()
+        return True
+
+    async def pace(self):
+        """按速率排队等待下一个派发时刻；重试同样经过这里，保证实际请求速率不超过设定"""
+        if not self.rate:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_at, now)
+            self.next_at = slot + 1.0 / self.rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class PoolReadiness:
+    """记录浏览器池启动耗时：首个浏览器就绪与全部就绪的时间"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.ready = 0
+        self.failed = 0
+        self.start = time.perf_counter()
+        self.first_ready_sec = None
+        self.all_ready_sec = None
+        self.lock = threading.Lock()
+
+    def mark_ready(self) -> bool:
+        with self.lock:
+            self.ready += 1
+            if self.first_ready_sec is None:
+                self.first_ready_sec = time.perf_counter() - self.start
+            return self._check_done()
+
+    def mark_failed(self) -> bool:
+        with self.lock:
+            self.failed += 1
+            return self._check_done()
+
+    def _check_done(self) -> bool:
+        # 返回True表示本次调用完成了整个池的启动
+        if self.ready + self.failed == self.size:
+            self.all_ready_sec = time.perf_counter() - self.start
+            return True
+        return False
+
+    def summary(self) -> str:
+        first = f"{self.first_ready_sec:.1f}秒" if self.first_ready_sec is not None else "-"
+        total = f"{self.all_ready_sec:.1f}秒" if self.all_ready_sec is not None else "-"
+        return f"浏览器池就绪: {self.ready}/{self.size}（失败 {self.failed}），首个就绪: {first}，全部启动完成: {total}"
+
+
+# ---------------- 错误分类 / 重试预算 / 熔断 -----------------
+OUTCOME_OK = "ok"
+
+ERROR_LABELS = {
+    "timeout": "超时",
+    "dns": "DNS解析失败",
+    "connect": "连接失败",
+    "reset": "连接被重置",
+    "http_5xx": "HTTP 5xx",
+    "http_429": "HTTP 429(限流)",
+    "tls": "TLS/证书错误",
+    "skipped": "未执行(引擎不可用)",
+    "http_4xx": "HTTP 4xx",
+    "other": "其他错误",
+}
+
+# 目标站点不健康时出现的瞬时错误：可重试，并计入熔断错误率
+TRANSIENT_ERRORS = frozenset({"timeout", "connect", "reset", "http_5xx", "http_429"})
+
+# 浏览器（Chromium net::ERR_*）错误信息到分类的映射
+_BROWSER_NET_ERRORS = (
+    ("ERR_NAME_NOT_RESOLVED", "dns"),
+    ("ERR_TIMED_OUT", "timeout"),
+    ("ERR_CONNECTION_TIMED_OUT", "timeout"),
+    ("ERR_CONNECTION_RESET", "reset"),
+    ("ERR_EMPTY_RESPONSE", "reset"),
+    ("ERR_CONNECTION_CLOSED", "reset"),
+    ("ERR_CONNECTION_REFUSED", "connect"),
+    ("ERR_ADDRESS_UNREACHABLE", "connect"),
+    ("ERR_CONNECTION_FAILED", "connect"),
+    ("ERR_CERT_", "tls"),
+    ("ERR_SSL_", "tls"),
+)
+
+
+def classify_status(status: int) -> str:
+    if 200 <= status < 400:
+        return OUTCOME_OK
+    if status >= 500:
+        return "http_5xx"
+    if status == 429:
+        return "http_429"
+    if status >= 400:
+        return "http_4xx"
+    return "other"
+
+
+def classify_error(exc: BaseException) -> str:
+    # TLS/证书错误是确定性的配置问题，不应重试或计入熔断；
+    # aiohttp 的 SSL 错误是 ClientConnectorError 的子类，须先判断
+    if isinstance(exc, (aiohttp.ClientSSLError, ssl.SSLError)):
+        return "tls"
+    # aiohttp 的连接错误包装了底层 OSError，需先看具体原因
+    if isinstance(exc, aiohttp.ClientConnectorError):
+        if isinstance(exc.os_error, socket.gaierror):
+            return "dns"
+        return "connect"
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, aiohttp.ServerTimeoutError)):
+        return "timeout"
+    if isinstance(exc, (ConnectionResetError, aiohttp.ServerDisconnectedError)):
+        return "reset"
+    if isinstance(exc, aiohttp.ClientOSError) and exc.errno == errno.ECONNRESET:
+        return "reset"
+    if isinstance(exc, socket.gaierror):
+        return "dns"
+    if isinstance(exc, ConnectionError):
+        return "connect"
+    # Playwright / Selenium 通过异常信息区分
+    message = str(exc)
+    for marker, kind in _BROWSER_NET_ERRORS:
+        if marker in message:
+            return kind
+    if "Timeout" in type(exc).__name__:
+        return "timeout"
+    return "other"
+
+
+class RetryBudget:
+    """有界重试预算：单次访问最多重试 max_retries 次，整轮运行的重试总数不超过 budget"""
+
+    def __init__(self, max_retries: int, budget: int, base_delay: float = 0.2, max_delay: float = 5.0):
+        self.max_retries = max_retries
+        self.remaining = budget
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.used = 0
+        self.lock = threading.Lock()
+
+    def try_acquire(self, attempt: int) -> bool:
+        if attempt >= self.max_retries:
+            return False
+        with self.lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            self.used += 1
+            return True
+
+    def backoff(self, attempt: int) -> float:
+        # 指数退避 + 全抖动，避免所有工作者同时重试
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """熔断器：最近窗口内瞬时错误率过高时暂停派发，冷却后仅放行一个探测请求，成功才恢复
+
+    恢复后不立即放开全部并发：同时在途请求数从 ramp_start 起步，每成功一次上限加一
+    （约每轮请求翻倍），直到覆盖所有等待中的工作者，避免对刚恢复的实例瞬间放出大量请求。
+    """
+
+    def __init__(
+        self,
+        window: int = 50,
+        min_samples: int = 20,
+        threshold: float = 0.5,
+        cooldown_sec: float = 5.0,
+        ramp_start: int = 2,
+        notify: Optional[Callable[[str], None]] = None,
+    ):
+        self.outcomes = deque(maxlen=window)
+        self.min_samples = min_samples
+        self.threshold = threshold
+        self.cooldown_sec = cooldown_sec
+        self.ramp_start = ramp_start
+        self.notify = notify
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.probing = False
+        self.trips = 0
+        self.in_flight = 0
+        self.waiting = 0
+        # 恢复阶段的在途请求上限，None 表示不限
+        self.ramp_limit = None
+
+    async def acquire(self) -> bool:
+        """等待允许派发；返回True表示本次请求是半开状态下的探测请求。每次放行后须调用 record"""
+        self.waiting += 1
+        try:
+            while True:
+                if self.state == "closed":
+                    if self.ramp_limit is None or self.in_flight < self.ramp_limit:
+                        self.in_flight += 1
+                        return False
+                    await asyncio.sleep(0.05)
+                    continue
+                if self.state == "open":
+                    wait = self.opened_at + self.cooldown_sec - time.monotonic()
+                    if wait > 0:
+                        await asyncio.sleep(min(wait, 0.5))
+                        continue
+                    self.state = "half_open"
+                    self.probing = False
+                if not self.probing:
+                    self.probing = True
+                    self.in_flight += 1
+                    return True
+                await asyncio.sleep(0.1)
+        finally:
+            self.waiting -= 1
+
+    def record(self, ok: bool, probe: bool):
+        self.in_flight = max(0, self.in_flight - 1)
+        if probe:
+            self.probing = False
+            if ok:
+                self.state = "closed"
+                self.outcomes.clear()
+                self.ramp_limit = self.ramp_start
+                self._log(f"✓ 探测成功，熔断恢复，并发从 {self.ramp_start} 逐步放开")
+            else:
+                self._open()
+            return
+        # 熔断打开前已发出的请求结果不再影响状态
+        if self.state != "closed":
+            return
+        self.outcomes.append(ok)
+        if ok and self.ramp_limit is not None:
+            self.ramp_limit += 1
+            if self.ramp_limit >= self.in_flight + self.waiting:
+                self.ramp_limit = None
+                self._log("✓ 并发已完全恢复")
+        if len(self.outcomes) >= self.min_samples:
+            error_rate = self.outcomes.count(False) / len(self.outcomes)
+            if error_rate >= self.threshold:
+                self._open(error_rate)
+
+    def _open(self, error_rate: Optional[float] = None):
+        self.state = "open"
+        self.ramp_limit = None
+        self.opened_at = time.monotonic()
+        self.trips += 1
+        if error_rate is None:
+            self._log(f"! 探测失败，熔断继续暂停 {self.cooldown_sec:.0f}秒")
+        else:
+            self._log(f"! 错误率 {error_rate * 100:.0f}% 触发熔断，暂停派发 {self.cooldown_sec:.0f}秒")
+
+    def _log(self, msg: str):
+        if self.notify:
+            self.notify(msg)
+
+
+async def guarded_visit(
+    visit: Callable,
+    retry_budget: Optional[RetryBudget] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    pace: Optional[Callable] = None,
+) -> str:
+    """执行一次访问：经过熔断器放行，瞬时错误在重试预算内按退避重试，返回最终结果分类
+
+    pace 为引擎的速率控制（如 JobPool.pace），每次重试前都会经过它。
+    """
+    attempt = 0
+    while True:
+        probe = await breaker.acquire() if breaker else False
+        outcome = await visit()
+        if breaker:
+            breaker.record(outcome not in TRANSIENT_ERRORS, probe)
+        if outcome == OUTCOME_OK or outcome not in TRANSIENT_ERRORS:
+            return outcome
+        if retry_budget is None or not retry_budget.try_acquire(attempt):
+            return outcome
+        await asyncio.sleep(retry_budget.backoff(attempt))
+        if pace is not None:
+            await pace()
+        attempt += 1
+
+
+class Scheduler:
+    """一次运行的共享调度：按引擎划分任务池与熔断器，共用计数器、进度条与重试预算"""
+
+    def __init__(self, times: int, pbar, max_retries: int = 0, use_breaker: bool = True):
+        self.counter = VisitCounter()
+        self.pbar = pbar
+        # 重试总量限制为计划访问量的20%，避免目标故障时重试放大流量
+        self.retry_budget = RetryBudget(max_retries, max(1, times // 5)) if max_retries > 0 else None
+        self.use_breaker = use_breaker
+        self.pools = {}
+        self.breakers = {}
+
+    def add_engine(self, name: str, total: int, rate: Optional[float] = None) -> JobPool:
+        self.pools[name] = JobPool(total, rate)
+        # 每个引擎独立的熔断窗口：浏览器超时常由压测机自身负载引起，不应暂停HTTP引擎
+        if self.use_breaker:
+            self.breakers[name] = CircuitBreaker(notify=lambda msg: self.pbar.write(f"[{name}] {msg}"))
+        return self.pools[name]
+
+    async def dispatch(self, engine: str, visit: Callable) -> None:
+        outcome = await guarded_visit(visit, self.retry_budget, self.breakers.get(engine), self.pools[engine].pace)
+        self.counter.record(outcome)
+        self.pbar.update(1)
+
+
+# ---------------- 性能计时 -----------------
+TIMING_LABELS = {
+    "http_response": "HTTP响应",
+    "ttfb": "首字节(TTFB)",
+    "dom_content_loaded": "DOMContentLoaded",
+    "load": "页面load",
+    "fcp": "首次内容绘制(FCP)",
+    "lcp": "最大内容绘制(LCP)",
+    "resource": "子资源加载",
+}
+
+# 在页面内读取 Navigation / Paint / LCP / Resource Timing（函数体，Selenium 直接执行，Playwright 包装为函数）
+PERF_TIMING_JS = """
+var out = {};
+try {
+  var nav = performance.getEntriesByType('navigation')[0];
+  if (nav) {
+    out.ttfb = nav.responseStart - nav.startTime;
+    out.dom_content_loaded = nav.domContentLoadedEventEnd - nav.startTime;
+    out.load = nav.loadEventEnd - nav.startTime;
+  }
+  var fcp = performance.getEntriesByName('first-contentful-paint')[0];
+  if (fcp) { out.fcp = fcp.startTime; }
+  try {
+    var po = new PerformanceObserver(function () {});
+    po.observe({type: 'largest-contentful-paint', buffered: true});
+    var lcp = po.takeRecords();
+    po.disconnect();
+    if (lcp.length) { out.lcp = lcp[lcp.length - 1].startTime; }
+  } catch (e) {}
+  out.resource = performance.getEntriesByType('resource').map(function (r) { return r.duration; });
+} catch (e) {}
+return out;
+"""
+
+
+def record_perf_timing(counter: VisitCounter, data) -> None:
+    if not isinstance(data, dict):
+        return
+    for name, value in data.items():
+        values = value if isinstance(value, list) else [value]
+        for v in values:
+            # 未触发的事件（如 loadEventEnd 为0）会得到非正值，忽略
+            if isinstance(v, (int, float)) and v > 0:
+                counter.record_timing(name, float(v))
+
 
 # UA 回退列表，fake_useragent不可用时使用
 FALLBACK_UA = [
@@ -87,6 +551,12 @@ def random_referer(url: str) -> str:
     return random.choice(candidates)
 
 
+def random_xff() -> str:
+    # 一次取32位随机数拆成四段，比四次 randint 便宜，可在每次请求时调用
+    n = random.getrandbits(32)
+    return f"{n % 250 + 1}.{(n >> 8) & 255}.{(n >> 16) & 255}.{(n >> 24) % 254 + 1}"
+
+
 def build_headers(ua_string: str, url: str) -> dict:
     # 浏览器更拟真：增加 sec-ch-ua / sec-fetch / accept-encoding / keep-alive 等
     platform = random.choice(["Windows", "macOS", "Linux", "Android", "iOS"])
@@ -121,7 +591,7 @@ def build_headers(ua_string: str, url: str) -> dict:
         "Sec-Fetch-Site": "none",
         "Sec-Fetch-User": "?1",
         # 可选伪造IP（部分站点忽略）
-        "X-Forwarded-For": f"{random.randint(1, 250)}.{random.randint(0, 255)}.{random.randint(0, 255)}.{random.randint(1, 254)}",
+        "X-Forwarded-For": random_xff(),
     }
 
 
@@ -133,6 +603,55 @@ def add_cache_bust(url: str) -> str:
     return urlunparse(parsed._replace(query=new_query))
 
 
+class CacheBustUrl:
+    """预编译的缓存破坏URL：只解析一次，之后每次仅拼接计数令牌"""
+
+    def __init__(self, url: str):
+        parsed = urlparse(url)
+        q = dict(parse_qsl(parsed.query))
+        q.pop("_", None)
+        base_query = urlencode(q)
+        # 以占位查询生成前缀，fragment 单独拼接在令牌之后
+        self._head = urlunparse(parsed._replace(query=(base_query + "&" if base_query else "") + "_=", fragment=""))
+        self._tail = f"#{parsed.fragment}" if parsed.fragment else ""
+        # 每次运行独立前缀 + 递增计数，保证令牌唯一且无需每次生成uuid
+        self._prefix = uuid.uuid4().hex[:12]
+        self._counter = itertools.count()
+
+    def next(self) -> str:
+        return f"{self._head}{self._prefix}{next(self._counter):x}{self._tail}"
+
+
+HEADER_POOL_SIZE = 64
+
+
+class RequestTemplate:
+    """每次运行编译一次的请求模板：URL前缀与一组只读请求头
+
+    UA / Referer / Accept-Language / 平台只在 pool_size 组组合中轮换（原先每次访问都重新随机），
+    X-Forwarded-For 仍在每次请求时重新生成。
+    """
+
+    def __init__(self, url: str, ua_provider: Optional[UserAgent], pool_size: int = HEADER_POOL_SIZE):
+        self.url = url
+        self.cache_bust = CacheBustUrl(url)
+        # 预生成请求头池，省去每次查询UA与构建请求头的开销
+        self.header_pool = tuple(
+            CIMultiDictProxy(CIMultiDict(build_headers(get_random_ua(ua_provider), url)))
+            for _ in range(max(1, pool_size))
+        )
+
+    def next_url(self) -> str:
+        return self.cache_bust.next()
+
+    def pick_headers(self) -> CIMultiDict:
+        # 复制池中的只读模板并替换 X-Forwarded-For；返回 CIMultiDict 时 aiohttp 不再做 dict→CIMultiDict 转换，
+        # 但每次请求仍会合并/复制一次请求头
+        headers = CIMultiDict(random.choice(self.header_pool))
+        headers["X-Forwarded-For"] = random_xff()
+        return headers
+
+
 def parse_proxy_for_playwright(p: str):
     try:
         u = urlparse(p)
@@ -158,18 +677,17 @@ def maybe_load_proxies() -> list:
 
 
 async def single_visit_http(
-    url: str,
+    template: RequestTemplate,
     session: ClientSession,
     refresh_once: bool,
     cookie_mode: str,
-    ua_provider: Optional[UserAgent],
     proxy: Optional[str] = None,
-) -> bool:
+    counter: Optional[VisitCounter] = None,
+) -> str:
     # 清理cookie以确保每次唯一（同一会话，但每次访问前清空）
     session.cookie_jar.clear()
 
-    ua_str = get_random_ua(ua_provider)
-    headers = build_headers(ua_str, url)
+    headers = template.pick_headers()
 
     # 自定义cookie（若选择），否则让服务器分配新的cookie
     cookies = None
@@ -177,7 +695,8 @@ async def single_visit_http(
         cookies = {"cid": uuid.uuid4().hex}
 
     try:
-        target_url = add_cache_bust(url)
+        target_url = template.next_url()
+        start = time.perf_counter()
         async with session.get(
             target_url,
             headers=headers,
@@ -186,11 +705,13 @@ async def single_visit_http(
             proxy=proxy,
         ) as resp:
             await resp.read()
-            ok1 = 200 <= resp.status < 400
+            outcome = classify_status(resp.status)
+        if counter is not None:
+            counter.record_timing("http_response", (time.perf_counter() - start) * 1000)
 
-        ok2 = True
-        if refresh_once:
-            refreshed_url = add_cache_bust(url)
+        if refresh_once and outcome == OUTCOME_OK:
+            refreshed_url = template.next_url()
+            start = time.perf_counter()
             async with session.get(
                 refreshed_url,
                 headers=headers,
@@ -199,28 +720,40 @@ async def single_visit_http(
                 proxy=proxy,
             ) as resp2:
                 await resp2.read()
-                ok2 = 200 <= resp2.status < 400
+                outcome = classify_status(resp2.status)
+            if counter is not None:
+                counter.record_timing("http_response", (time.perf_counter() - start) * 1000)
 
-        return bool(ok1 and ok2)
-    except Exception:
-        return False
+        return outcome
+    except Exception as e:
+        return classify_error(e)
 
 
-async def run_http(
+async def http_engine(
     url: str,
-    times: int,
     concurrency: int,
     refresh_once: bool,
     cookie_mode: str,
+    scheduler: Scheduler,
     timeout_sec: int = 12,
-) -> tuple:
+    header_pool_size: int = HEADER_POOL_SIZE,
+) -> None:
+    jobs = scheduler.pools["http"]
+    if jobs.total <= 0 and jobs.closed:
+        return
+
     ua_provider = None
     try:
         ua_provider = UserAgent()
     except Exception:
         ua_provider = None
 
+    # 请求模板每次运行只编译一次
+    template = RequestTemplate(url, ua_provider, header_pool_size)
+
     proxies = maybe_load_proxies()
+    if jobs.closed:
+        concurrency = min(concurrency, jobs.total)
     connector = TCPConnector(limit=concurrency * 8, limit_per_host=concurrency * 4)
 
     # 为每个并发工作者创建一个独立的会话（各自的cookie jar），并复用连接
@@ -234,43 +767,62 @@ async def run_http(
         for _ in range(concurrency)
     ]
 
-    counter = VisitCounter()
-    with tqdm(total=times, desc="访问进度") as pbar:
-        # 将任务平均分配到各个会话上，确保每个会话内部串行执行，避免cookie清理冲突
-        base = times // concurrency
-        rem = times % concurrency
-        per_worker_counts = [base + (1 if i < rem else 0) for i in range(concurrency)]
-
-        async def worker(i: int, count: int):
-            session = sessions[i]
-            proxy = random.choice(proxies) if proxies else None
-            for _ in range(count):
-                ok = await single_visit_http(
-                    url,
+    # 各会话从共享任务池领取任务，会话内部串行执行，避免cookie清理冲突
+    async def worker(i: int):
+        session = sessions[i]
+        proxy = random.choice(proxies) if proxies else None
+        while await jobs.acquire():
+            await scheduler.dispatch(
+                "http",
+                lambda: single_visit_http(
+                    template,
                     session,
                     refresh_once,
                     cookie_mode,
-                    ua_provider,
                     proxy,
+                    scheduler.counter,
                 )
-                if ok:
-                    counter.increment_success()
-                else:
-                    counter.increment_fail()
-                pbar.update(1)
+            )
 
-        tasks = [asyncio.create_task(worker(i, c)) for i, c in enumerate(per_worker_counts) if c > 0]
+    try:
+        tasks = [asyncio.create_task(worker(i)) for i in range(concurrency)]
         await asyncio.gather(*tasks)
+    finally:
+        # 关闭所有会话和连接器
+        for s in sessions:
+            await s.close()
+        await connector.close()
+
 
-    # 关闭所有会话和连接器
-    for s in sessions:
-        await s.close()
-    connector.close()
-    return counter.get_counts()
+async def run_http(
+    url: str,
+    times: int,
+    concurrency: int,
+    refresh_once: bool,
+    cookie_mode: str,
+    timeout_sec: int = 12,
+    max_retries: int = 0,
+    use_breaker: bool = True,
+    header_pool_size: int = HEADER_POOL_SIZE,
+) -> VisitCounter:
+    with tqdm(total=times, desc="访问进度") as pbar:
+        scheduler = Scheduler(times, pbar, max_retries, use_breaker)
+        scheduler.add_engine("http", times)
+        await http_engine(url, concurrency, refresh_once, cookie_mode, scheduler, timeout_sec, header_pool_size)
+    return scheduler.counter
 
 
 # ---------------- Playwright JS 模式（无需 Chromedriver） -----------------
-async def single_visit_playwright_js(browser, url: str, refresh_once: bool, cookie_mode: str, dwell_ms: int, ua_provider: Optional[UserAgent]) -> bool:
+async def single_visit_playwright_js(
+    browser,
+    url: str,
+    refresh_once: bool,
+    cookie_mode: str,
+    dwell_ms: int,
+    ua_provider: Optional[UserAgent],
+    counter: Optional[VisitCounter] = None,
+) -> str:
+    context = None
     try:
         ua_str = get_random_ua(ua_provider)
         locale = random.choice(["zh-CN", "en-US", "zh-TW"])
@@ -289,20 +841,47 @@ async def single_visit_playwright_js(browser, url: str, refresh_once: bool, cook
         await page.add_init_script("try{localStorage.clear();sessionStorage.clear();}catch(e){}")
 
         target = add_cache_bust(url)
-        await page.goto(target, wait_until="load", timeout=20000)
+        resp = await page.goto(target, wait_until="load", timeout=20000)
         if refresh_once:
-            await page.reload(wait_until="load")
+            resp = await page.reload(wait_until="load")
+        if resp is not None:
+            outcome = classify_status(resp.status)
+            if outcome != OUTCOME_OK:
+                return outcome
 
         # 等待JS逻辑执行
         await asyncio.sleep(max(0, dwell_ms) / 1000.0)
 
-        await context.close()
-        return True
-    except Exception:
-        return False
+        # 停留结束后再采集，LCP 等指标此时已稳定；采集失败不影响访问结果
+        if counter is not None:
+            try:
+                record_perf_timing(counter, await page.evaluate(f"() => {{{PERF_TIMING_JS}}}"))
+            except Exception:
+                pass
+        return OUTCOME_OK
+    except Exception as e:
+        return classify_error(e)
+    finally:
+        if context is not None:
+            try:
+                await context.close()
+            except Exception:
+                pass
 
 
-async def run_playwright_js(url: str, times: int, concurrency: int, refresh_once: bool, cookie_mode: str, dwell_ms: int) -> tuple:
+async def playwright_engine(
+    url: str,
+    concurrency: int,
+    refresh_once: bool,
+    cookie_mode: str,
+    dwell_ms: int,
+    scheduler: Scheduler,
+    launch_parallelism: int = 4,
+) -> None:
+    jobs = scheduler.pools["browser"]
+    if jobs.total <= 0:
+        return
+
     ua_provider = None
     try:
         ua_provider = UserAgent()
@@ -310,50 +889,137 @@ async def run_playwright_js(url: str, times: int, concurrency: int, refresh_once
         ua_provider = None
 
     proxies = maybe_load_proxies()
-    counter = VisitCounter()
+    pbar = scheduler.pbar
 
     async with async_playwright() as p:
-        # 构建浏览器池（每个并发一个浏览器，可绑定不同代理）
-        browsers = []
-        for i in range(concurrency):
+        # 浏览器池并发启动（限制同时启动数量），每个工作者启动自己的浏览器后立即开始领取任务
+        pool_size = min(concurrency, jobs.total)
+        launch_sem = asyncio.Semaphore(max(1, min(pool_size, launch_parallelism)))
+        readiness = PoolReadiness(pool_size)
+
+        async def worker(idx: int):
             proxy_cfg = None
             if proxies:
                 pr = parse_proxy_for_playwright(random.choice(proxies))
                 proxy_cfg = pr if pr else None
-            b = await p.chromium.launch(headless=True, proxy=proxy_cfg, args=[
-                "--disable-gpu",
-                "--no-sandbox",
-                "--disable-web-security",
-                "--disable-extensions",
-                "--disable-dev-shm-usage",
-            ])
-            browsers.append(b)
-
-        with tqdm(total=times, desc="访问进度") as pbar:
-            base = times // concurrency
-            rem = times % concurrency
-            per_counts = [base + (1 if i < rem else 0) for i in range(concurrency)]
-
-            async def worker(idx: int, count: int):
-                b = browsers[idx]
-                for _ in range(count):
-                    ok = await single_visit_playwright_js(b, url, refresh_once, cookie_mode, dwell_ms, ua_provider)
-                    if ok:
-                        counter.increment_success()
-                    else:
-                        counter.increment_fail()
-                    pbar.update(1)
-
-            tasks = [asyncio.create_task(worker(i, c)) for i, c in enumerate(per_counts) if c > 0]
-            await asyncio.gather(*tasks)
-
-        for b in browsers:
             try:
-                await b.close()
-            except Exception:
-                pass
+                async with launch_sem:
+                    b = await p.chromium.launch(headless=True, proxy=proxy_cfg, args=[
+                        "--disable-gpu",
+                        "--no-sandbox",
+                        "--disable-web-security",
+                        "--disable-extensions",
+                        "--disable-dev-shm-usage",
+                    ])
+            except Exception as e:
+                pbar.write(f"浏览器{idx}启动失败: {e}")
+                if readiness.mark_failed():
+                    pbar.write(readiness.summary())
+                return
+            if readiness.mark_ready():
+                pbar.write(readiness.summary())
+            try:
+                while await jobs.acquire():
+                    await scheduler.dispatch(
+                        "browser",
+                        lambda: single_visit_playwright_js(
+                            b, url, refresh_once, cookie_mode, dwell_ms, ua_provider, scheduler.counter
+                        )
+                    )
+            finally:
+                try:
+                    await b.close()
+                except Exception:
+                    pass
+
+        tasks = [asyncio.create_task(worker(i)) for i in range(pool_size)]
+        await asyncio.gather(*tasks)
+
+    if readiness.ready == 0:
+        raise RuntimeError("浏览器池启动失败，没有可用的浏览器")
+
 
-    return counter.get_counts()
+async def run_playwright_js(
+    url: str,
+    times: int,
+    concurrency: int,
+    refresh_once: bool,
+    cookie_mode: str,
+    dwell_ms: int,
+    launch_parallelism: int = 4,
+    max_retries: int = 0,
+    use_breaker: bool = True,
+) -> VisitCounter:
+    with tqdm(total=times, desc="访问进度") as pbar:
+        scheduler = Scheduler(times, pbar, max_retries, use_breaker)
+        scheduler.add_engine("browser", times)
+        await playwright_engine(url, concurrency, refresh_once, cookie_mode, dwell_ms, scheduler, launch_parallelism)
+    return scheduler.counter
+
+
+# ---------------- 混合模式（HTTP + Playwright 共用调度与统计） -----------------
+def split_hybrid(times: int, browser_ratio: Optional[float] = None, http_rate: Optional[float] = None, browser_rate: Optional[float] = None) -> tuple:
+    """按浏览器占比或两个引擎的速率划分访问量，返回 (HTTP次数, 浏览器次数)"""
+    if http_rate and browser_rate:
+        browser_ratio = browser_rate / (http_rate + browser_rate)
+    browser_times = int(round(times * (browser_ratio or 0.0)))
+    browser_times = max(0, min(times, browser_times))
+    return times - browser_times, browser_times
+
+
+async def run_hybrid(
+    url: str,
+    times: int,
+    http_concurrency: int,
+    browser_concurrency: int,
+    refresh_once: bool,
+    cookie_mode: str,
+    dwell_ms: int,
+    browser_ratio: Optional[float] = None,
+    http_rate: Optional[float] = None,
+    browser_rate: Optional[float] = None,
+    launch_parallelism: int = 4,
+    max_retries: int = 0,
+    use_breaker: bool = True,
+    header_pool_size: int = HEADER_POOL_SIZE,
+) -> VisitCounter:
+    http_times, browser_times = split_hybrid(times, browser_ratio, http_rate, browser_rate)
+    with tqdm(total=times, desc="访问进度") as pbar:
+        scheduler = Scheduler(times, pbar, max_retries, use_breaker)
+        # 按速率划分时各引擎按各自速率派发；按比例划分时不限速
+        paced = bool(http_rate and browser_rate)
+        scheduler.add_engine("http", http_times, http_rate if paced else None)
+        scheduler.add_engine("browser", browser_times, browser_rate if paced else None)
+        pbar.write(f"HTTP访问: {http_times}, 浏览器访问: {browser_times}")
+
+        # 浏览器引擎结束前HTTP任务池保持打开，HTTP工作者不会提前退出，确保转交的任务一定有人执行
+        http_pool = scheduler.pools["http"]
+        http_pool.hold_open()
+        http_task = asyncio.create_task(http_engine(url, http_concurrency, refresh_once, cookie_mode, scheduler, header_pool_size=header_pool_size))
+        try:
+            await playwright_engine(url, browser_concurrency, refresh_once, cookie_mode, dwell_ms, scheduler, launch_parallelism)
+        except Exception as e:
+            # 浏览器池不可用时不中断整轮运行：剩余浏览器份额转交HTTP引擎
+            if http_task.done():
+                pbar.write(f"! 浏览器引擎失败: {e}，HTTP引擎已退出，剩余浏览器访问计为未执行")
+            else:
+                moved = scheduler.pools["browser"].drain()
+                http_pool.add(moved)
+                pbar.write(f"! 浏览器引擎失败: {e}，剩余 {moved} 次浏览器访问改由HTTP引擎执行")
+        finally:
+            http_pool.close()
+
+        (http_result,) = await asyncio.gather(http_task, return_exceptions=True)
+        if isinstance(http_result, Exception):
+            pbar.write(f"! HTTP引擎失败: {http_result}")
+
+        # 引擎异常退出后仍未执行的访问计为失败，保证统计完整
+        for pool in scheduler.pools.values():
+            left = pool.drain()
+            if left:
+                scheduler.counter.increment_fail("skipped", left)
+                pbar.update(left)
+    return scheduler.counter
 
 
 # ---------------- Selenium 备用模式（需要本地Chrome/Chromedriver） -----------------
@@ -364,7 +1030,21 @@ def get_cache_dir() -> str:
     return cache_dir
 
 
-def create_driver(user_agent: str):
+def prepare_uc_patcher():
+    """浏览器池启动前下载并修补一次 undetected-chromedriver，之后各浏览器直接复用修补好的驱动并行启动"""
+    if uc is None:
+        return None
+    try:
+        with _UC_PATCH_LOCK:
+            patcher = uc.Patcher()
+            patcher.auto()
+        return patcher
+    except Exception as e:
+        tqdm.write(f"undetected-chromedriver准备失败，改用常规chromedriver: {e}")
+        return None
+
+
+def create_driver(user_agent: str, uc_driver_path: Optional[str] = None):
     chrome_options = Options()
     chrome_options.add_argument(f"user-agent={user_agent}")
     chrome_options.add_argument("--headless=new")
@@ -391,12 +1071,18 @@ def create_driver(user_agent: str):
     chrome_options.add_experimental_option("prefs", prefs)
 
     # 优先使用 undetected-chromedriver，绕过常见反爬检测
-    if uc is not None:
+    # 传入已修补的驱动路径时 uc 只检查不再改写文件，可安全并行启动
+    if uc is not None and uc_driver_path:
         try:
-            driver = uc.Chrome(options=chrome_options, headless=True, use_subprocess=True)
+            driver = uc.Chrome(
+                options=chrome_options,
+                headless=True,
+                use_subprocess=True,
+                driver_executable_path=uc_driver_path,
+            )
             return driver
-        except Exception:
-            pass
+        except Exception as e:
+            tqdm.write(f"undetected-chromedriver启动失败，改用常规chromedriver: {e}")
 
     # 退回到常规 chromedriver
     return webdriver.Chrome(options=chrome_options)
@@ -423,61 +1109,122 @@ def selenium_visit_once(driver, url: str, pbar, counter: VisitCounter, refresh_o
             pass
         # JS停留以保证前端计数逻辑执行
         time.sleep(random.uniform(0.8, 1.6))
+        try:
+            record_perf_timing(counter, driver.execute_script(PERF_TIMING_JS))
+        except Exception:
+            pass
 
         counter.increment_success()
         pbar.update(1)
         success, fail = counter.get_counts()
         pbar.write(f"成功: {success}, 失败: {fail}, 总耗时: {time.time() - start:.1f}秒")
     except Exception as e:
-        counter.increment_fail()
+        kind = classify_error(e)
+        counter.increment_fail(kind)
         pbar.update(1)
-        pbar.write(f"浏览器访问失败: {e}")
+        pbar.write(f"浏览器访问失败({ERROR_LABELS[kind]}): {e}")
 
 
-def selenium_visit_url(url: str, times: int, max_workers: int = 4, refresh_once: bool = True):
-    # 预创建浏览器池并复用，避免反复启动浏览器的巨大开销
-    drivers = []
-    try:
-        for _ in range(max_workers):
-            ua_str = get_random_ua(None)
-            d = create_driver(ua_str)
-            d.set_page_load_timeout(25)
-            d.set_script_timeout(25)
-            drivers.append(d)
-
-        counter = VisitCounter()
-        from concurrent.futures import ThreadPoolExecutor
-        with tqdm(total=times, desc="访问进度") as pbar:
-            def worker(idx: int, count: int):
-                driver = drivers[idx]
-                for _ in range(count):
+def selenium_visit_url(url: str, times: int, max_workers: int = 4, refresh_once: bool = True, launch_parallelism: int = 4) -> VisitCounter:
+    # 浏览器池并发启动并复用：每个线程启动自己的浏览器（限制同时启动数量），就绪后立即领取任务
+    pool_size = min(max_workers, times)
+    launch_sem = threading.Semaphore(max(1, min(pool_size, launch_parallelism)))
+    readiness = PoolReadiness(pool_size)
+    jobs = JobPool(times)
+    counter = VisitCounter()
+    # 只串行修补一次驱动；保留 patcher 引用直到浏览器池结束
+    uc_patcher = prepare_uc_patcher()
+    uc_driver_path = uc_patcher.executable_path if uc_patcher else None
+
+    from concurrent.futures import ThreadPoolExecutor
+    with tqdm(total=times, desc="访问进度") as pbar:
+        def worker(idx: int):
+            try:
+                with launch_sem:
+                    ua_str = get_random_ua(None)
+                    driver = create_driver(ua_str, uc_driver_path)
+                    driver.set_page_load_timeout(25)
+                    driver.set_script_timeout(25)
+            except Exception as e:
+                pbar.write(f"浏览器{idx}启动失败: {e}")
+                if readiness.mark_failed():
+                    pbar.write(readiness.summary())
+                return
+            if readiness.mark_ready():
+                pbar.write(readiness.summary())
+            try:
+                while jobs.take():
                     # 清理cookie以确保每次独立
                     try:
                         driver.delete_all_cookies()
                     except Exception:
                         pass
                     selenium_visit_once(driver, url, pbar, counter, refresh_once)
+            finally:
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+
+        with ThreadPoolExecutor(max_workers=max(1, pool_size)) as executor:
+            futures = [executor.submit(worker, i) for i in range(pool_size)]
+            for f in futures:
+                f.result()
+
+    if readiness.ready == 0:
+        raise RuntimeError("浏览器池启动失败，Chrome浏览器或Chromedriver不可用")
+
+    return counter
+
+
+def print_stats(counter: VisitCounter, times: int):
+    success, fail = counter.get_counts()
+    print("访问统计:")
+    print(f"成功: {success}")
+    print(f"失败: {fail}")
+    print(f"成功率: {(success / times * 100):.1f}%")
+    errors = counter.get_errors()
+    if errors:
+        print("失败分类:")
+        for kind, n in sorted(errors.items(), key=lambda kv: -kv[1]):
+            print(f"  {ERROR_LABELS.get(kind, kind)}: {n}")
+    timings = counter.get_timings()
+    if timings:
+        print("性能计时(ms):")
+        for name in [n for n in TIMING_LABELS if n in timings]:
+            h = timings[name]
+            print(
+                f"  {TIMING_LABELS[name]}: 样本 {h.count}, 平均 {h.mean():.0f}, "
+                f"P50 {h.percentile(50):.0f}, P90 {h.percentile(90):.0f}, "
+                f"P99 {h.percentile(99):.0f}, 最大 {h.max:.0f}"
+            )
 
-            base = times // max_workers
-            rem = times % max_workers
-            per_counts = [base + (1 if i < rem else 0) for i in range(max_workers)]
 
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                futures = [executor.submit(worker, i, c) for i, c in enumerate(per_counts) if c > 0]
-                for f in futures:
-                    f.result()
+def ask_number(prompt: str, default, low, high, cast=int):
+    while True:
+        try:
+            value_input = input(prompt).strip()
+            value = cast(value_input) if value_input else default
+            if low <= value <= high:
+                return value
+            print(f"请输入{low}-{high}之间的数字")
+        except ValueError:
+            print("请输入有效的数字")
 
-        success, fail = counter.get_counts()
-        print("\n访问统计:")
-        print(f"成功: {success}")
-        print(f"失败: {fail}")
-        print(f"成功率: {(success / times * 100):.1f}%")
-    finally:
-        for d in drivers:
-            try:
-                d.quit()
-            except Exception:
-                pass
+
+def ask_failure_policy() -> tuple:
+    while True:
+        try:
+            retries_input = input("瞬时错误(超时/连接失败/5xx)重试次数 (默认0，不重试): ").strip()
+            max_retries = int(retries_input) if retries_input else 0
+            if 0 <= max_retries <= 5:
+                break
+            print("请输入0-5之间的数字")
+        except ValueError:
+            print("请输入有效的数字")
+    breaker_ans = input("目标错误率过高时自动熔断暂停? [Y/n]: ").strip().lower()
+    use_breaker = False if breaker_ans == "n" else True
+    return max_retries, use_breaker
 
 
 def main():
@@ -500,11 +1247,13 @@ def main():
         print(f"! URL测试失败: {e}，但仍将继续")
 
     # 选择模式
-    mode_in = input("选择模式: [1] HTTP极速 [2] 浏览器(Selenium) [3] 浏览器(Playwright 无Chromedriver，默认): ").strip()
+    mode_in = input("选择模式: [1] HTTP极速 [2] 浏览器(Selenium) [3] 浏览器(Playwright 无Chromedriver，默认) [4] 混合(HTTP+Playwright): ").strip()
     if mode_in == "1":
         mode = "http"
     elif mode_in == "2":
         mode = "selenium"
+    elif mode_in == "4":
+        mode = "hybrid"
     else:
         mode = "playwright"  # 默认为 playwright
 
@@ -534,36 +1283,74 @@ def main():
         refresh_once = False if refresh_ans == "n" else True
         cookie_mode_in = input("cookie模式: [1] 服务器分配(默认) [2] 自定义随机cid: ").strip()
         cookie_mode = "custom" if cookie_mode_in == "2" else "server"
+        max_retries, use_breaker = ask_failure_policy()
 
         print(f"\n开始HTTP并发访问 {url}...")
-        print(f"并发: {concurrency}, 计划访问: {times}, 刷新: {refresh_once}, cookie模式: {cookie_mode}")
+        print(f"并发: {concurrency}, 计划访问: {times}, 刷新: {refresh_once}, cookie模式: {cookie_mode}, 重试: {max_retries}, 熔断: {use_breaker}")
         try:
-            success, fail = asyncio.run(
-                run_http(url, times, concurrency, refresh_once, cookie_mode)
+            counter = asyncio.run(
+                run_http(url, times, concurrency, refresh_once, cookie_mode, max_retries=max_retries, use_breaker=use_breaker)
             )
             print("\n✓ 访问完成！")
-            print("访问统计:")
-            print(f"成功: {success}")
-            print(f"失败: {fail}")
-            print(f"成功率: {(success / times * 100):.1f}%")
+            print_stats(counter, times)
         except KeyboardInterrupt:
             print("\n! 程序被用户中断")
         except Exception as e:
             print(f"\n× 程序执行出错: {e}")
         finally:
             print("程序已退出")
-    elif mode == "selenium":
-        # 浏览器模式简单检测（不强制）
+    elif mode == "hybrid":
+        # 混合模式：HTTP 承担主要流量，Playwright 浏览器池只需按其份额配置
+        if async_playwright is None:
+            print("未检测到playwright库，请先安装: pip install playwright，并执行: python -m playwright install chromium")
+            return
+
+        http_concurrency = ask_number("请输入HTTP并发数 (默认10，建议10-200): ", 10, 1, 1000)
+        browser_concurrency = ask_number("请输入浏览器并发数 (默认2，建议1-20): ", 2, 1, 50)
+
+        split_in = input("流量划分: [1] 按浏览器占比(默认) [2] 按各引擎速率: ").strip()
+        browser_ratio = None
+        http_rate = None
+        browser_rate = None
+        if split_in == "2":
+            http_rate = ask_number("HTTP速率(次/秒，可为小数，默认50): ", 50.0, 0.01, 100000, cast=float)
+            browser_rate = ask_number("浏览器速率(次/秒，可为小数如0.5，默认1): ", 1.0, 0.01, 1000, cast=float)
+        else:
+            browser_ratio = ask_number("浏览器访问占比% (默认10): ", 10, 0, 100) / 100.0
+
+        refresh_ans = input("是否每次刷新一次页面? [Y/n]: ").strip().lower()
+        refresh_once = False if refresh_ans == "n" else True
+        cookie_mode_in = input("cookie模式: [1] 服务器分配(默认) [2] 自定义随机cid: ").strip()
+        cookie_mode = "custom" if cookie_mode_in == "2" else "server"
+        dwell_ms = ask_number("JS停留毫秒 (默认800，建议800-3000): ", 800, 200, 10000)
+        max_retries, use_breaker = ask_failure_policy()
+
+        http_times, browser_times = split_hybrid(times, browser_ratio, http_rate, browser_rate)
+        print(f"\n开始混合访问 {url}...")
+        print(
+            f"HTTP: {http_times}次/并发{http_concurrency}, 浏览器: {browser_times}次/并发{browser_concurrency}, "
+            f"刷新: {refresh_once}, cookie模式: {cookie_mode}, JS停留: {dwell_ms}ms, 重试: {max_retries}, 熔断: {use_breaker}"
+        )
+        if http_rate and browser_rate:
+            print(f"速率: HTTP {http_rate}次/秒, 浏览器 {browser_rate}次/秒")
         try:
-            options = Options()
-            options.add_argument("--headless=new")
-            test_driver = webdriver.Chrome(options=options)
-            test_driver.quit()
-            print("✓ Chrome浏览器检测正常")
+            counter = asyncio.run(
+                run_hybrid(
+                    url, times, http_concurrency, browser_concurrency, refresh_once, cookie_mode, dwell_ms,
+                    browser_ratio=browser_ratio, http_rate=http_rate, browser_rate=browser_rate,
+                    max_retries=max_retries, use_breaker=use_breaker,
+                )
+            )
+            print("\n✓ 访问完成！")
+            print_stats(counter, times)
+        except KeyboardInterrupt:
+            print("\n! 程序被用户中断")
         except Exception as e:
-            print("× Chrome浏览器检测失败或Chromedriver不可用，将继续尝试运行")
-            print(f"错误信息: {e}")
-
+            print(f"\n× 程序执行出错: {e}")
+        finally:
+            print("程序已退出")
+    elif mode == "selenium":
+        # 不再单独启动测试浏览器：浏览器池启动时若全部失败会直接报错
         while True:
             try:
                 threads = int(input("请输入并行线程数(建议1-8): "))
@@ -587,8 +1374,9 @@ def main():
         print(f"\n开始使用浏览器访问 {url}...")
         print(f"使用 {threads} 个并行线程，计划访问 {times} 次，JS停留{dwell_ms}ms")
         try:
-            selenium_visit_url(url, times, max_workers=threads, refresh_once=True)
+            counter = selenium_visit_url(url, times, max_workers=threads, refresh_once=True)
             print("\n✓ 访问完成！")
+            print_stats(counter, times)
         except KeyboardInterrupt:
             print("\n! 程序被用户中断")
         except Exception as e:
@@ -625,18 +1413,19 @@ def main():
                 print("请输入200-10000之间的数字")
             except ValueError:
                 print("请输入有效的数字")
+        max_retries, use_breaker = ask_failure_policy()
 
         print(f"\n开始Playwright并发访问 {url}...")
-        print(f"并发: {concurrency}, 计划访问: {times}, 刷新: {refresh_once}, cookie模式: {cookie_mode}, JS停留: {dwell_ms}ms")
+        print(f"并发: {concurrency}, 计划访问: {times}, 刷新: {refresh_once}, cookie模式: {cookie_mode}, JS停留: {dwell_ms}ms, 重试: {max_retries}, 熔断: {use_breaker}")
         try:
-            success, fail = asyncio.run(
-                run_playwright_js(url, times, concurrency, refresh_once, cookie_mode, dwell_ms)
+            counter = asyncio.run(
+                run_playwright_js(
+                    url, times, concurrency, refresh_once, cookie_mode, dwell_ms,
+                    max_retries=max_retries, use_breaker=use_breaker,
+                )
             )
             print("\n✓ 访问完成！")
-            print("访问统计:")
-            print(f"成功: {success}")
-            print(f"失败: {fail}")
-            print(f"成功率: {(success / times * 100):.1f}%")
+            print_stats(counter, times)
         except KeyboardInterrupt:
             print("\n! 程序被用户中断")
         except Exception as e:
@@ -0,0 +1,337 @@
+import asyncio
+import random
+import threading
+import time
+from types import SimpleNamespace
+from urllib.parse import parse_qsl, urlparse
+
+import pytest
+
+from main import (
+    OUTCOME_OK,
+    CacheBustUrl,
+    CircuitBreaker,
+    JobPool,
+    LatencyHistogram,
+    PoolReadiness,
+    RequestTemplate,
+    RetryBudget,
+    classify_status,
+    guarded_visit,
+    split_hybrid,
+)
+
+
+def test_retry_budget_caps_per_visit_and_total():
+    budget = RetryBudget(max_retries=2, budget=3)
+    assert budget.try_acquire(0)
+    assert budget.try_acquire(1)
+    assert not budget.try_acquire(2)
+    assert budget.try_acquire(0)
+    assert not budget.try_acquire(0)
+    assert budget.used == 3
+
+
+def test_circuit_breaker_opens_probes_once_and_closes():
+    async def scenario():
+        breaker = CircuitBreaker(window=10, min_samples=4, threshold=0.5, cooldown_sec=0.05)
+        for _ in range(4):
+            assert await breaker.acquire() is False
+            breaker.record(False, probe=False)
+        assert breaker.state == "open"
+
+        # 冷却后只放行一个探测请求，其余请求等待
+        probe = await breaker.acquire()
+        assert probe is True
+        assert breaker.state == "half_open"
+        waiter = asyncio.create_task(breaker.acquire())
+        await asyncio.sleep(0.15)
+        assert not waiter.done()
+
+        # 探测失败重新打开
+        breaker.record(False, probe=True)
+        assert breaker.state == "open"
+        assert breaker.trips == 2
+
+        # 再次冷却后，等待中的请求成为新的探测请求；探测成功则关闭
+        assert await waiter is True
+        breaker.record(True, probe=True)
+        assert breaker.state == "closed"
+        assert len(breaker.outcomes) == 0
+        assert await breaker.acquire() is False
+
+    asyncio.run(scenario())
+
+
+def test_circuit_breaker_ramps_concurrency_after_recovery():
+    async def scenario():
+        breaker = CircuitBreaker(window=10, min_samples=2, threshold=0.5, cooldown_sec=0.01, ramp_start=2)
+        for _ in range(2):
+            await breaker.acquire()
+            breaker.record(False, probe=False)
+        assert breaker.state == "open"
+        assert await breaker.acquire() is True
+
+        waiters = [asyncio.create_task(breaker.acquire()) for _ in range(10)]
+        await asyncio.sleep(0.02)
+        breaker.record(True, probe=True)
+        assert breaker.state == "closed"
+
+        # 恢复后只放行 ramp_start 个在途请求，其余继续等待
+        await asyncio.sleep(0.15)
+        assert sum(w.done() for w in waiters) == 2
+
+        # 每成功一次上限加一：完成1个在途请求后可再放行2个
+        breaker.record(True, probe=False)
+        await asyncio.sleep(0.15)
+        assert sum(w.done() for w in waiters) == 4
+
+        while not all(w.done() for w in waiters):
+            breaker.record(True, probe=False)
+            await asyncio.sleep(0.06)
+        assert breaker.ramp_limit is None
+
+    asyncio.run(scenario())
+
+
+def test_guarded_visit_retries_transient_within_budget():
+    calls = []
+
+    async def visit():
+        calls.append(1)
+        return "timeout"
+
+    budget = RetryBudget(max_retries=2, budget=10, base_delay=0.001)
+    assert asyncio.run(guarded_visit(visit, budget)) == "timeout"
+    assert len(calls) == 3
+
+
+def test_guarded_visit_does_not_retry_permanent_errors():
+    calls = []
+
+    async def visit():
+        calls.append(1)
+        return "tls"
+
+    budget = RetryBudget(max_retries=2, budget=10, base_delay=0.001)
+    assert asyncio.run(guarded_visit(visit, budget)) == "tls"
+    assert len(calls) == 1
+
+
+def test_retries_go_through_engine_pacer():
+    async def scenario():
+        pool = JobPool(1, rate=20)
+        calls = []
+
+        async def visit():
+            calls.append(time.monotonic())
+            return "timeout"
+
+        budget = RetryBudget(max_retries=3, budget=10, base_delay=0.0)
+        assert await pool.acquire()
+        await guarded_visit(visit, budget, pace=pool.pace)
+        return calls
+
+    calls = asyncio.run(scenario())
+    assert len(calls) == 4
+    # 20次/秒 => 相邻请求至少间隔约50ms
+    gaps = [b - a for a, b in zip(calls, calls[1:])]
+    assert min(gaps) >= 0.045
+
+
+def test_classify_status():
+    assert classify_status(200) == OUTCOME_OK
+    assert classify_status(302) == OUTCOME_OK
+    assert classify_status(404) == "http_4xx"
+    assert classify_status(429) == "http_429"
+    assert classify_status(503) == "http_5xx"
+
+
+@pytest.mark.parametrize("fail_after", [0.0, 0.05, 0.5])
+def test_hybrid_moves_browser_share_to_http_on_pool_failure(monkeypatch, fail_after):
+    from aiohttp import web
+
+    import main
+
+    async def failing_playwright_engine(*args, **kwargs):
+        # 0.5秒时HTTP自身份额早已完成，验证其工作者仍在等待转交的任务
+        await asyncio.sleep(fail_after)
+        raise RuntimeError("浏览器池启动失败，没有可用的浏览器")
+
+    monkeypatch.setattr(main, "playwright_engine", failing_playwright_engine)
+    monkeypatch.setattr(main, "maybe_load_proxies", lambda: [])
+    # UA 查询改为即时返回，避免测试结果依赖 fake_useragent 的耗时
+    monkeypatch.setattr(main, "UserAgent", lambda: None)
+    monkeypatch.setattr(main, "get_random_ua", lambda provider: "UA")
+
+    async def handler(request):
+        return web.Response(text="ok")
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_get("/", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            return await main.run_hybrid(
+                f"http://127.0.0.1:{port}/", 40, 2, 2, False, "server", 200,
+                browser_ratio=0.5,
+            )
+        finally:
+            await runner.cleanup()
+
+    counter = asyncio.run(scenario())
+    assert counter.get_counts() == (40, 0)
+
+
+def test_cache_bust_url_keeps_query_and_fragment():
+    c = CacheBustUrl("https://a.com/p?x=1&_=old#frag")
+    first, second = c.next(), c.next()
+    assert first != second
+    parsed = urlparse(first)
+    assert parsed.path == "/p"
+    assert parsed.fragment == "frag"
+    q = dict(parse_qsl(parsed.query))
+    assert q["x"] == "1"
+    assert q["_"] != "old"
+
+
+def test_cache_bust_url_without_query():
+    url = CacheBustUrl("https://a.com").next()
+    assert url.startswith("https://a.com?_=")
+
+
+def test_request_template_reuses_pool_but_varies_xff():
+    template = RequestTemplate("https://a.com", SimpleNamespace(random="UA"), pool_size=2)
+    assert len(template.header_pool) == 2
+    picked = [template.pick_headers() for _ in range(50)]
+    assert all(h["User-Agent"] == "UA" for h in picked)
+    assert len({h["X-Forwarded-For"] for h in picked}) > 40
+    # 池中模板保持只读、不被请求修改
+    picked[0]["X-Forwarded-For"] = "changed"
+    assert all(h["X-Forwarded-For"] != "changed" for h in template.header_pool)
+
+
+def test_pool_readiness_reports_first_and_full_pool():
+    readiness = PoolReadiness(3)
+    assert readiness.mark_ready() is False
+    first = readiness.first_ready_sec
+    assert first is not None
+    assert readiness.mark_failed() is False
+    assert readiness.all_ready_sec is None
+    assert readiness.mark_ready() is True
+    assert readiness.first_ready_sec == first
+    assert readiness.all_ready_sec >= first
+    assert "2/3" in readiness.summary()
+
+
+def test_job_pool_hands_failed_launch_share_to_other_workers():
+    jobs = JobPool(10)
+    taken = []
+
+    def worker(idx):
+        if idx == 0:
+            return  # 模拟浏览器启动失败，不领取任何任务
+        while jobs.take():
+            taken.append(idx)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(taken) == 10
+    assert 0 not in taken
+    assert not jobs.take()
+
+
+def _fake_selenium(monkeypatch, fail_launches):
+    import main
+
+    launches = []
+
+    class FakeDriver:
+        def set_page_load_timeout(self, _):
+            pass
+
+        def set_script_timeout(self, _):
+            pass
+
+        def delete_all_cookies(self):
+            pass
+
+        def quit(self):
+            pass
+
+    def fake_create_driver(user_agent, uc_driver_path=None):
+        launches.append(uc_driver_path)
+        if len(launches) <= fail_launches:
+            raise RuntimeError("chrome not found")
+        return FakeDriver()
+
+    def fake_visit_once(driver, url, pbar, counter, refresh_once):
+        counter.increment_success()
+        pbar.update(1)
+
+    monkeypatch.setattr(main, "uc", None)
+    monkeypatch.setattr(main, "get_random_ua", lambda provider: "UA")
+    monkeypatch.setattr(main, "create_driver", fake_create_driver)
+    monkeypatch.setattr(main, "selenium_visit_once", fake_visit_once)
+    return launches
+
+
+def test_selenium_pool_survivors_take_failed_share(monkeypatch):
+    import main
+
+    launches = _fake_selenium(monkeypatch, fail_launches=1)
+    counter = main.selenium_visit_url("https://a.com", 12, max_workers=3)
+    assert len(launches) == 3
+    assert counter.get_counts() == (12, 0)
+
+
+def test_selenium_pool_raises_when_no_browser_starts(monkeypatch):
+    import main
+
+    _fake_selenium(monkeypatch, fail_launches=3)
+    with pytest.raises(RuntimeError):
+        main.selenium_visit_url("https://a.com", 5, max_workers=3)
+
+
+def test_create_driver_reuses_prepatched_uc_driver(monkeypatch):
+    import main
+
+    calls = []
+
+    class FakeUc:
+        @staticmethod
+        def Chrome(**kwargs):
+            calls.append(kwargs)
+            return "driver"
+
+    monkeypatch.setattr(main, "uc", FakeUc)
+    assert main.create_driver("UA", "/tmp/undetected_chromedriver") == "driver"
+    assert calls[0]["driver_executable_path"] == "/tmp/undetected_chromedriver"
+
+
+def test_latency_histogram_percentiles():
+    rng = random.Random(1)
+    values = sorted(rng.uniform(1, 1000) for _ in range(10000))
+    h = LatencyHistogram()
+    for v in values:
+        h.add(v)
+    assert h.count == len(values)
+    for p in (50, 90, 99):
+        exact = values[int(len(values) * p / 100) - 1]
+        assert abs(h.percentile(p) - exact) / exact < 0.05
+    assert h.percentile(100) <= h.max
+    assert LatencyHistogram().percentile(50) == 0.0
+
+
+def test_split_hybrid_by_ratio_and_rate():
+    assert split_hybrid(1000, browser_ratio=0.1) == (900, 100)
+    assert split_hybrid(1000, http_rate=9, browser_rate=1) == (900, 100)
+    assert split_hybrid(10, browser_ratio=1.0) == (0, 10)
+    assert split_hybrid(10) == (10, 0)